@@ -2,7 +2,8 @@
 /**
  * Import Bolagsverket Parquet data to Supabase
  *
- * Imports 1.88M companies from 2 parquet files in batches of 1000
+ * Imports 1.88M companies from 2 parquet files in batches of 2000,
+ * uploading up to 8 batches concurrently
  * Estimated time: 20-30 minutes
  */
 
@@ -10,6 +11,8 @@ import { createClient } from '@supabase/supabase-js';
 import { spawn } from 'child_process';
 import { writeFileSync } from 'fs';
 import { join } from 'path';
+import type { Readable } from 'stream';
+import { StringDecoder } from 'string_decoder';
 import 'dotenv/config';
 
 const supabaseUrl = process.env.SUPABASE_URL!;
@@ -33,24 +36,35 @@ const PARQUET_FILES = [
   join(process.cwd(), 'data/train-00001-of-00002.parquet')
 ];
 
-const BATCH_SIZE = 1000;
+const BATCH_SIZE = 2000;
+const MAX_CONCURRENT_BATCHES = 8;
 const MAX_RETRIES = 3;
 const RETRY_DELAY_MS = 2000;
 
 // Sleep helper
 const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
 
+// PostgREST bulk upsert endpoint; batches arrive from Python already serialized
+const UPSERT_URL = `${supabaseUrl}/rest/v1/companies?on_conflict=organisationsidentitet`;
+const UPSERT_HEADERS = {
+  apikey: supabaseKey,
+  Authorization: `Bearer ${supabaseKey}`,
+  'Content-Type': 'application/json',
+  Prefer: 'resolution=merge-duplicates,return=minimal'
+};
+
 // Retry logic for batch import
-async function importBatchWithRetry(batch: any[], batchNum: number, totalBatches: number, retries = 0): Promise<{ success: boolean; error?: any }> {
+async function importBatchWithRetry(body: string, batchNum: number, totalBatches: number, retries = 0): Promise<{ success: boolean; error?: any }> {
   try {
-    const { error } = await supabase
-      .from('companies')
-      .upsert(batch, {
-        onConflict: 'organisationsidentitet',
-        ignoreDuplicates: false
-      });
-
-    if (error) throw error;
+    const response = await fetch(UPSERT_URL, {
+      method: 'POST',
+      headers: UPSERT_HEADERS,
+      body
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${await response.text()}`);
+    }
     return { success: true };
 
   } catch (error: any) {
@@ -58,7 +72,7 @@ async function importBatchWithRetry(batch: any[], batchNum: number, totalBatches
       const delay = RETRY_DELAY_MS * (retries + 1);
       console.log(`  ⚠️  Retry ${retries + 1}/${MAX_RETRIES} after ${delay}ms...`);
       await sleep(delay);
-      return importBatchWithRetry(batch, batchNum, totalBatches, retries + 1);
+      return importBatchWithRetry(body, batchNum, totalBatches, retries + 1);
     }
 
     console.error(`  ❌ Batch ${batchNum}/${totalBatches} failed after ${MAX_RETRIES} retries:`, error.message);
@@ -66,9 +80,35 @@ async function importBatchWithRetry(batch: any[], batchNum: number, totalBatches
   }
 }
 
+// Yield complete lines from a stream. The next chunk is only pulled once the
+// consumer asks for another line, so a slow consumer back-pressures the writer
+// (readline's iterator would instead queue lines in memory without limit)
+async function* readLines(stream: Readable): AsyncGenerator<string> {
+  const decoder = new StringDecoder('utf8');
+  let pending = '';
+
+  for await (const chunk of stream) {
+    // StringDecoder keeps multi-byte characters split across chunks intact
+    const text = decoder.write(chunk);
+    let start = 0;
+    let newline: number;
+
+    while ((newline = text.indexOf('\n', start)) !== -1) {
+      yield pending + text.slice(start, newline);
+      pending = '';
+      start = newline + 1;
+    }
+    pending += text.slice(start);
+  }
+
+  pending += decoder.end();
+  if (pending) yield pending;
+}
+
 async function importData() {
   console.log('🚀 Starting Bolagsverket → Supabase import...\n');
   console.log('📦 Batch size:', BATCH_SIZE);
+  console.log('🔀 Concurrent batches:', MAX_CONCURRENT_BATCHES);
   console.log('📄 Processing', PARQUET_FILES.length, 'parquet files\n');
 
   let totalImported = 0;
@@ -87,79 +127,126 @@ async function importData() {
 
     // Python script to read parquet and output JSON batches
     const pythonScript = `
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 import json
 import sys
 
+# orjson is optional; it serializes batches several times faster than json
+try:
+    import orjson
+
+    def dumps(value):
+        return orjson.dumps(value)
+except ImportError:
+    def dumps(value):
+        return json.dumps(value, default=lambda v: v.isoformat()).encode('utf-8')
+
 parquet_file = '${parquetPath}'
 batch_size = ${BATCH_SIZE}
 
+# Supabase columns to import; namnskyddslopnummer (100% null) and the pandas
+# __index_level_0__ are never read from the parquet file
+IMPORT_COLUMNS = [
+    'organisationsidentitet',
+    'registreringsland',
+    'organisationsnamn',
+    'organisationsform',
+    'avregistreringsdatum',
+    'avregistreringsorsak',
+    'pagandeavvecklingselleromsstruktureringsforfarande',
+    'registreringsdatum',
+    'verksamhetsbeskrivning',
+    'postadress',
+]
+
+# DATE columns in Supabase
+DATE_COLUMNS = ['registreringsdatum', 'avregistreringsdatum']
+
+# Parquet columns whose lowercased name differs from the Supabase column
+RENAMED_COLUMNS = {
+    'pagandeavvecklingselleromstruktureringsforfarande': 'pagandeavvecklingselleromsstruktureringsforfarande',
+}
+
+def column_name(parquet_name):
+    return RENAMED_COLUMNS.get(parquet_name.lower(), parquet_name.lower())
+
+def clean_table(table):
+    # Lowercase column names to match the Supabase schema
+    table = table.rename_columns([column_name(c) for c in table.column_names])
+
+    # Treat literal 'None' strings as nulls
+    for idx, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            col = table.column(idx)
+            table = table.set_column(idx, field.name, pc.if_else(pc.equal(col, 'None'), None, col))
+
+    # Transform organisationsnamn: remove $FORETAGSNAMN-ORGNAM$ suffix
+    idx = table.schema.get_field_index('organisationsnamn')
+    # Strip everything from the first '$' onwards
+    cleaned = pc.utf8_trim_whitespace(pc.replace_substring_regex(table.column(idx), r'(?s)\\$.*', ''))
+    table = table.set_column(idx, 'organisationsnamn', cleaned)
+
+    # Transform postadress: multiline to comma-separated
+    idx = table.schema.get_field_index('postadress')
+    if idx >= 0:
+        address = pc.utf8_trim_whitespace(pc.replace_substring(table.column(idx), '\\n', ', '))
+        # Remove leading comma if address starts with newline
+        address = pc.utf8_trim_whitespace(pc.replace_substring_regex(address, '^,', ''))
+        table = table.set_column(idx, 'postadress', address)
+
+    # Send timestamp-typed dates as plain dates so they serialize as YYYY-MM-DD
+    for name in DATE_COLUMNS:
+        idx = table.schema.get_field_index(name)
+        if idx >= 0 and pa.types.is_timestamp(table.schema.field(idx).type):
+            table = table.set_column(idx, name, pc.cast(table.column(idx), pa.date32()))
+
+    # Only keep rows that have the required fields
+    return table.filter(pc.and_(
+        pc.is_valid(table.column('organisationsidentitet')),
+        pc.is_valid(table.column('organisationsnamn'))
+    ))
+
 try:
-    # Read parquet file
-    table = pq.read_table(parquet_file)
-    df = table.to_pandas()
+    # Stream the parquet file batch by batch instead of loading it into memory
+    parquet = pq.ParquetFile(parquet_file)
 
-    # Replace NaN with None
-    df = df.where(df.notna(), None)
+    # Only decode the columns that are imported
+    columns = [c for c in parquet.schema_arrow.names if column_name(c) in IMPORT_COLUMNS]
 
     # Get total rows
-    total_rows = len(df)
+    total_rows = parquet.metadata.num_rows
     print(f"Total rows in file: {total_rows:,}", file=sys.stderr)
 
     # Process in batches
-    for i in range(0, total_rows, batch_size):
-        batch = df.iloc[i:i+batch_size]
-
-        # Convert to records
-        records = batch.to_dict('records')
-
-        # Clean up data
-        cleaned_records = []
-        for record in records:
-            cleaned = {}
-            for k, v in record.items():
-                # Skip null values and deprecated field
-                if v is None or v == 'None':
-                    continue
-
-                # Skip namnskyddslopnummer (100% null)
-                if k == 'namnskyddslopnummer':
-                    continue
-
-                # Skip __index_level_0__ (internal pandas index)
-                if k == '__index_level_0__':
-                    continue
-
-                # Transform organisationsnamn: remove $FORETAGSNAMN-ORGNAM$ suffix
-                if k == 'organisationsnamn' and isinstance(v, str):
-                    v = v.split('$')[0].strip()
-
-                # Transform postadress: multiline to comma-separated
-                if k == 'postadress' and isinstance(v, str):
-                    v = v.replace('\\n', ', ').strip()
-                    # Remove leading comma if address starts with newline
-                    if v.startswith(','):
-                        v = v[1:].strip()
-
-                cleaned[k] = v
-
-            # Only add if we have required fields
-            if 'organisationsidentitet' in cleaned and 'organisationsnamn' in cleaned:
-                cleaned_records.append(cleaned)
+    start = 0
+    for record_batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        batch = clean_table(pa.Table.from_batches([record_batch]))
+        end = start + record_batch.num_rows
+
+        # Arrow emits None for nulls, so records need no per-cell cleanup
+        records = batch.to_pylist()
 
         # Output batch info
-        batch_num = (i // batch_size) + 1
+        batch_num = (start // batch_size) + 1
         total_batches = (total_rows + batch_size - 1) // batch_size
 
-        print(json.dumps({
+        meta = dumps({
             'batch': batch_num,
             'total_batches': total_batches,
-            'start': i,
-            'end': min(i + batch_size, total_rows),
-            'records': cleaned_records,
+            'start': start,
+            'end': end,
+            'rows': len(records),
             'file_num': ${fileNum},
             'total_files': ${PARQUET_FILES.length}
-        }))
+        })
+
+        # One line per batch: metadata, a tab, then the records as the request body.
+        # JSON escapes tabs inside strings, so the first tab is always the separator.
+        sys.stdout.buffer.write(meta + b'\\t' + dumps(records) + b'\\n')
+
+        start = end
 
 except Exception as e:
     print(f"Error: {e}", file=sys.stderr)
@@ -179,58 +266,66 @@ except Exception as e:
       }
     });
 
-    let buffer = '';
+    python.stderr.on('data', (data) => {
+      const msg = data.toString();
+      if (msg.includes('Total rows in file:')) {
+        console.log('📊', msg.trim());
+      } else if (msg.includes('Error:')) {
+        console.error('❌ Python error:', msg);
+      }
+    });
+
+    const exitCode = new Promise<number | null>((resolve) => {
+      python.on('close', resolve);
+    });
 
-    python.stdout.on('data', async (data) => {
-      buffer += data.toString();
-      const lines = buffer.split('\n');
-      buffer = lines.pop() || '';
+    // Read batches line by line; Python blocks on a full pipe while we are not reading
+    const inFlight = new Set<Promise<void>>();
 
-      for (const line of lines) {
-        if (!line.trim()) continue;
+    for await (const line of readLines(python.stdout)) {
+      if (!line.trim()) continue;
 
-        try {
-          const batch = JSON.parse(line);
-          const { batch: batchNum, total_batches, records, file_num } = batch;
+      try {
+        // Only the metadata is parsed; the records are posted as-is
+        const separator = line.indexOf('\t');
+        const { batch: batchNum, total_batches, rows, file_num } = JSON.parse(line.slice(0, separator));
+        const body = line.slice(separator + 1);
 
-          // Import to Supabase with retry
-          const progress = ((totalImported + records.length) / 1883264) * 100;
-          console.log(`📥 [File ${file_num}/${PARQUET_FILES.length}] Batch ${batchNum}/${total_batches} (${records.length} rows) - ${progress.toFixed(1)}% total`);
+        // Import to Supabase with retry
+        console.log(`📥 [File ${file_num}/${PARQUET_FILES.length}] Batch ${batchNum}/${total_batches} (${rows} rows)`);
 
-          const result = await importBatchWithRetry(records, batchNum, total_batches);
+        const upload: Promise<void> = importBatchWithRetry(body, batchNum, total_batches).then((result) => {
+          inFlight.delete(upload);
 
           if (result.success) {
-            totalImported += records.length;
-            console.log(`   ✓ Imported (${totalImported.toLocaleString()} total)\n`);
+            totalImported += rows;
+            // Report progress on completion; at dispatch other batches may still be in flight
+            const progress = (totalImported / 1883264) * 100;
+            console.log(`   ✓ Batch ${batchNum} imported (${totalImported.toLocaleString()} total) - ${progress.toFixed(1)}% total\n`);
           } else {
             totalErrors++;
           }
+        });
+        inFlight.add(upload);
 
-        } catch (err) {
-          console.error('Error parsing batch:', err);
-          totalErrors++;
+        // Wait for a free upload slot before pulling the next line. Nothing is
+        // read from stdout meanwhile, so Python blocks once the pipe is full.
+        if (inFlight.size >= MAX_CONCURRENT_BATCHES) {
+          await Promise.race(inFlight);
         }
-      }
-    });
 
-    python.stderr.on('data', (data) => {
-      const msg = data.toString();
-      if (msg.includes('Total rows in file:')) {
-        console.log('📊', msg.trim());
-      } else if (msg.includes('Error:')) {
-        console.error('❌ Python error:', msg);
+      } catch (err) {
+        console.error('Error parsing batch:', err);
+        totalErrors++;
       }
-    });
+    }
 
-    await new Promise((resolve, reject) => {
-      python.on('close', (code) => {
-        if (code === 0) {
-          resolve(code);
-        } else {
-          reject(new Error(`Python process exited with code ${code}`));
-        }
-      });
-    });
+    await Promise.all(inFlight);
+
+    const code = await exitCode;
+    if (code !== 0) {
+      throw new Error(`Python process exited with code ${code}`);
+    }
   }
 
   const duration = ((Date.now() - startTime) / 1000 / 60).toFixed(1);